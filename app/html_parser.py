@@ -1,38 +1,67 @@
-from bs4 import BeautifulSoup
+from collections import OrderedDict
 
+import lxml.html
+
+FORM_ROW_XPATH = ".//tr[contains(concat(' ', normalize-space(@class), ' '), ' formRow ')]"
+FIELD_LABEL_XPATH = ".//label[contains(concat(' ', normalize-space(@class), ' '), ' fieldLabel ')]"
+
+# Parsed results keyed by hash(html_content), so the cache never holds whole pages
+QA_CACHE_SIZE = 512
+_qa_cache = OrderedDict()
+
+
+def _classes(element):
+    return element.get('class', '').split()
+
+
+def _text(element):
+    # Same result as BeautifulSoup's get_text(strip=True)
+    return ''.join(piece.strip() for piece in element.itertext())
 
-def parse_qa_requirements(html_content):
-    # Parse HTML with BeautifulSoup
-    soup = BeautifulSoup(html_content, 'html.parser')
+
+def _parse_qa_requirements_tree(html_content):
+    # Parse HTML with lxml
+    tree = lxml.html.fromstring(html_content)
 
     # Initialize result dictionary
     qa_requirements = {}
 
     # Find the QA Requirement table
-    table = soup.find('table', id='sect_s3')
-    if not table:
+    # Search the whole document: for a fragment, fromstring returns the table itself as the root
+    tables = tree.getroottree().xpath("//table[@id='sect_s3']")
+    if not tables:
         print("Table with id='sect_s3' not found in HTML.")
         return qa_requirements
 
     # Iterate through each row in the table
-    for row in table.find_all('tr', class_='formRow'):
-        tds = row.find_all('td')
-        i = 0
-        while i < len(tds):
-            td = tds[i]
-            label_elem = td.find('label', class_='fieldLabel')
-            if label_elem:
-                label_text = label_elem.get_text(strip=True)
-                if 'label' in td.get('class', []):  # Text field label
-                    i += 1
-                    if i < len(tds):
-                        content_td = tds[i]
-                        if 'cell' in content_td.get('class', []):
-                            cell_text = content_td.get_text(strip=True).strip()
-                            qa_requirements[label_text] = cell_text
-                else:  # Checkbox field
-                    checkmark = td.find('img', alt='Yes')
-                    qa_requirements[label_text] = bool(checkmark)
-            i += 1
-
-    return qa_requirements
\ No newline at end of file
+    for row in tables[0].xpath(FORM_ROW_XPATH):
+        tds = iter(row.xpath('.//td'))
+        for td in tds:
+            label_elems = td.xpath(FIELD_LABEL_XPATH)
+            if not label_elems:
+                continue
+
+            label_text = _text(label_elems[0])
+            if 'label' in _classes(td):  # Text field label
+                content_td = next(tds, None)
+                if content_td is not None and 'cell' in _classes(content_td):
+                    qa_requirements[label_text] = _text(content_td)
+            else:  # Checkbox field
+                qa_requirements[label_text] = bool(td.xpath(".//img[@alt='Yes']"))
+
+    return qa_requirements
+
+
+def parse_qa_requirements(html_content):
+    html_hash = hash(html_content)
+    qa_requirements = _qa_cache.get(html_hash)
+    if qa_requirements is None:
+        qa_requirements = _parse_qa_requirements_tree(html_content)
+        _qa_cache[html_hash] = qa_requirements
+        if len(_qa_cache) > QA_CACHE_SIZE:
+            _qa_cache.popitem(last=False)
+    else:
+        _qa_cache.move_to_end(html_hash)
+
+    # Hand out a copy so callers can't mutate the cached entry
+    return dict(qa_requirements)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from pathlib import Path
 
-import pandas as pd
+from python_calamine import CalamineWorkbook
 
 
 def read_material_numbers_from_excel(path: str | Path, column_name: str) -> list[str]:
@@ -13,24 +13,31 @@ def read_material_numbers_from_excel(path: str | Path, column_name: str) -> list
         print(f"File not found: {path}")
         return []
 
+    # A dict keeps first-seen order while de-duplicating in the same pass
+    material_numbers: dict[str, None] = {}
     try:
-        engine = "xlrd" if path.suffix.lower() == ".xls" else "openpyxl"
-        data = pd.read_excel(path, engine=engine, sheet_name=None)
+        workbook = CalamineWorkbook.from_path(path)
+        for sheet_name in workbook.sheet_names:
+            # Stream rows instead of building a DataFrame; the header row locates the column
+            rows = workbook.get_sheet_by_name(sheet_name).iter_rows()
+            header = next(rows, None)
+            if not header or column_name not in header:
+                continue
+
+            col_idx = header.index(column_name)
+            for row in rows:
+                value = row[col_idx] if col_idx < len(row) else None
+                if value is None:
+                    continue
+                if isinstance(value, float) and value.is_integer():
+                    # Numeric cells come back as floats; 6824679.0 is material 6824679
+                    value = int(value)
+                number = str(value).strip()
+                if number:
+                    material_numbers[number] = None
     except Exception as e:
         print(f"Error reading Excel file {path}: {e}")
         return []
 
-    material_numbers: list[str] = []
-    for sheet_name, df in data.items():
-        if column_name in df.columns:
-            numbers = (
-                df[column_name]
-                .dropna()
-                .astype(str)
-                .map(str.strip)
-                .tolist()
-            )
-            material_numbers.extend(filter(None, numbers))
-
-    # Return unique values while preserving no order requirement
-    return list({number for number in material_numbers})
\ No newline at end of file
+    # Unique values in the order they first appear
+    return list(material_numbers)
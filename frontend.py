@@ -1,6 +1,11 @@
+import asyncio
 import json
+import os
 import shutil
 import time
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Iterable
 
@@ -10,14 +15,36 @@ from info_extraction.result_to_excel import generate_reports
 from main_flow import extract_data
 
 EXCEL_SUFFIXES = {".xlsx", ".xls"}
+STORED_SUFFIXES = {".png", ".jpg", ".jpeg", ".xlsx", ".zip"}
 TEMP_DIR = Path("./temp_uploads")
 DOWNLOADS_DIR = Path("./downloads")
+OUTPUT_RETENTION_DAYS = 7
+CLEANUP_INTERVAL_SECONDS = 60 * 60
+
+_cleanup_task: asyncio.Task | None = None
 
 
 def save_to_temp(file_path: Path) -> Path:
     TEMP_DIR.mkdir(parents=True, exist_ok=True)
     dest_path = TEMP_DIR / file_path.name
-    dest_path.write_bytes(file_path.read_bytes())
+    if dest_path.resolve() == file_path.resolve():
+        return dest_path.resolve()
+
+    # Build the file under a unique name and swap it in with os.replace, so a concurrent save
+    # of an upload with the same name never writes through another upload's hard link
+    tmp_path = TEMP_DIR / f".{file_path.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        # The upload is already on disk, so a hard link avoids copying any bytes
+        os.link(file_path, tmp_path)
+    except OSError:
+        # Cross-device, no hard link support, link limit or permissions: kernel-side copy.
+        # tmp_path is unique, so the copy can't write through someone else's link
+        shutil.copyfile(file_path, tmp_path)
+    try:
+        os.replace(tmp_path, dest_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
     return dest_path.resolve()
 
 
@@ -33,11 +60,11 @@ def coerce_to_path(uploaded) -> Path:
     raise TypeError(f"Unsupported file reference type: {type(uploaded)}")
 
 
-def get_list_path(files: Iterable) -> dict:
+async def get_list_path(files: Iterable) -> dict:
     if not files:
         return {"message": "No files were provided.", "saved_paths": []}
 
-    saved_paths: list[str] = []
+    source_paths: list[Path] = []
     for uploaded in files:
         source_path = coerce_to_path(uploaded)
 
@@ -47,7 +74,11 @@ def get_list_path(files: Iterable) -> dict:
         if source_path.suffix.lower() not in EXCEL_SUFFIXES:
             continue
 
-        saved_paths.append(str(save_to_temp(source_path)))
+        source_paths.append(source_path)
+
+    # Copy the uploads concurrently, off the event loop
+    saved = await asyncio.gather(*(asyncio.to_thread(save_to_temp, p) for p in source_paths))
+    saved_paths = [str(p) for p in saved]
 
     if not saved_paths:
         return {"message": "No valid Excel files were saved.", "saved_paths": []}
@@ -71,19 +102,63 @@ def package_output(output_folder: Path) -> Path:
     if zip_path.exists():
         zip_path.unlink()
 
-    shutil.make_archive(
-        base_name=str(zip_base),
-        format="zip",
-        root_dir=output_folder,
-    )
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for file_path in sorted(p for p in output_folder.rglob("*") if p.is_file()):
+            # Images and workbooks are already compressed; deflating them again only burns CPU
+            compress_type = (
+                zipfile.ZIP_STORED
+                if file_path.suffix.lower() in STORED_SUFFIXES
+                else zipfile.ZIP_DEFLATED
+            )
+            archive.write(
+                file_path,
+                arcname=file_path.relative_to(output_folder),
+                compress_type=compress_type,
+            )
     return zip_path
 
 
+def remove_expired_outputs() -> None:
+    """Delete timestamped output folders older than OUTPUT_RETENTION_DAYS."""
+    if not DOWNLOADS_DIR.is_dir():
+        return
+
+    threshold = date.today() - timedelta(days=OUTPUT_RETENTION_DAYS)
+    for subfolder in DOWNLOADS_DIR.iterdir():
+        if subfolder.is_dir():
+            try:
+                folder_date = datetime.strptime(subfolder.name.split("_")[0], "%Y%m%d").date()
+            except ValueError:
+                continue
+            if folder_date < threshold:
+                shutil.rmtree(subfolder)
+
+
+async def periodic_cleanup() -> None:
+    """Remove expired output folders every CLEANUP_INTERVAL_SECONDS, off the event loop."""
+    while True:
+        try:
+            await asyncio.to_thread(remove_expired_outputs)
+        except Exception as e:
+            print(f"Cleanup of old outputs failed: {e}")
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+
+
+async def start_periodic_cleanup() -> None:
+    """Start the cleanup task once, on Gradio's event loop."""
+    global _cleanup_task
+    if _cleanup_task is None or _cleanup_task.done():
+        _cleanup_task = asyncio.create_task(periodic_cleanup())
+
+
 async def run_extraction(files):
+    # API and gradio_client callers never trigger demo.load, so make sure pruning runs for them too
+    await start_periodic_cleanup()
+
     if Path("temp_data").is_dir():
-        shutil.rmtree("temp_data")
+        await asyncio.to_thread(shutil.rmtree, "temp_data")
 
-    upload_info = get_list_path(files)
+    upload_info = await get_list_path(files)
     if not upload_info["saved_paths"]:
         # No valid files — hide download button
         # return upload_info, gr.update(value=None, visible=False)
@@ -98,17 +173,6 @@ async def run_extraction(files):
     output_folder = DOWNLOADS_DIR / timestamp
     output_folder.mkdir(parents=True, exist_ok=True)
 
-    # Clean up old data
-    current_date = int(time.strftime("%Y%m%d"))
-    for subfolder in DOWNLOADS_DIR.iterdir():
-        if subfolder.is_dir():
-            try:
-                folder_date = int(subfolder.name.split("_")[0])
-                if folder_date < current_date - 7:  # older than 7 days
-                    shutil.rmtree(subfolder)
-            except ValueError:
-                continue
-
     vv = await extract_data(upload_info["saved_paths"], output_folder=output_folder)
     if not vv:
         # upload_info["message"] = "No Material number found in the Excel. :("
@@ -121,7 +185,7 @@ async def run_extraction(files):
             gr.update(interactive=True),
         )
 
-    generate_reports(output_folder)
+    await asyncio.to_thread(generate_reports, output_folder)
 
     # response = {
     #     **upload_info,
@@ -131,10 +195,10 @@ async def run_extraction(files):
     response = "# ✅ **Your file is ready! :)**"
 
     summary_dir = output_folder / "summary"
-    zip_path = package_output(summary_dir)
+    zip_path = await asyncio.to_thread(package_output, summary_dir)
 
     if Path("temp_data").is_dir():
-        shutil.rmtree("temp_data")
+        await asyncio.to_thread(shutil.rmtree, "temp_data")
 
     return response, gr.update(
         value=str(zip_path),
@@ -181,5 +245,9 @@ with gr.Blocks() as demo:
         outputs=[output, download_button, upload_button],
     )
 
+    # Old outputs are pruned in the background rather than on every upload; the task starts on
+    # the first page load or the first extraction, whichever comes first
+    demo.load(fn=start_periodic_cleanup, inputs=None, outputs=None)
+
 if __name__ == "__main__":
     demo.launch(server_name="0.0.0.0", server_port=7860)
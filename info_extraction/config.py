@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from dotenv import load_dotenv
 
@@ -23,6 +23,14 @@ class Config:
     supplier_material_id_field: str = "Supplier Material ID#"
     image_field: str = "Image"
     related_material_field: str = "Related Material"  # Placeholder for the query field
+    # Field ids to request per table; empty means resolve them from the labels above
+    material_field_ids: list[int] = field(default_factory=list)
+    attachment_field_ids: list[int] = field(default_factory=list)
+
+
+def _parse_field_ids(value: str | None) -> list[int]:
+    """Parses a comma-separated list of field ids, e.g. "6,7,8"."""
+    return [int(part) for part in (value or "").split(",") if part.strip()]
 
 
 def load_config() -> Config:
@@ -39,6 +47,8 @@ def load_config() -> Config:
         token=os.getenv("TOKEN"),
         related_material_field=os.getenv("RELATED_MATERIAL_FIELD", "Related Material"),
         headless=True if (os.getenv("HEADLESS")) == "1" else False,
+        material_field_ids=_parse_field_ids(os.getenv("MATERIAL_FIELD_IDS")),
+        attachment_field_ids=_parse_field_ids(os.getenv("ATTACHMENT_FIELD_IDS")),
     )
 
 
@@ -1,71 +1,104 @@
-from bs4 import BeautifulSoup
+from collections import OrderedDict
 
+import lxml.html
+
+FORM_ROW_XPATH = ".//tr[contains(concat(' ', normalize-space(@class), ' '), ' formRow ')]"
+FIELD_LABEL_XPATH = ".//label[contains(concat(' ', normalize-space(@class), ' '), ' fieldLabel ')]"
+CELL_TD_XPATH = "following::td[contains(concat(' ', normalize-space(@class), ' '), ' cell ')][1]"
+
+# Parsed pages keyed by hash(html_content), so the cache never holds whole pages
+PAGE_CACHE_SIZE = 512
+_page_cache = OrderedDict()
+
+
+def _classes(element):
+    return element.get('class', '').split()
 
-def parse_qa_requirements(html_content):
-    # Parse HTML with BeautifulSoup
-    soup = BeautifulSoup(html_content, 'html.parser')
 
+def _text(element):
+    # Same result as BeautifulSoup's get_text(strip=True)
+    return ''.join(piece.strip() for piece in element.itertext())
+
+
+def _qa_requirements_from_tree(tree):
     # Initialize result dictionary
     qa_requirements = {}
 
     # Find the QA Requirement table
-    table = soup.find('table', id='sect_s3')
-    if not table:
+    # Search the whole document: for a fragment, fromstring returns the table itself as the root
+    tables = tree.getroottree().xpath("//table[@id='sect_s3']")
+    if not tables:
         print("Table with id='sect_s3' not found in HTML.")
         return qa_requirements
 
     # Iterate through each row in the table
-    for row in table.find_all('tr', class_='formRow'):
-        tds = row.find_all('td')
-        i = 0
-        while i < len(tds):
-            td = tds[i]
-            label_elem = td.find('label', class_='fieldLabel')
-            if label_elem:
-                label_text = label_elem.get_text(strip=True)
-                if 'label' in td.get('class', []):  # Text field label
-                    i += 1
-                    if i < len(tds):
-                        content_td = tds[i]
-                        if 'cell' in content_td.get('class', []):
-                            cell_text = content_td.get_text(strip=True).strip()
-                            qa_requirements[label_text] = cell_text
-                else:  # Checkbox field
-                    checkmark = td.find('img', alt='Yes')
-                    qa_requirements[label_text] = bool(checkmark)
-            i += 1
+    for row in tables[0].xpath(FORM_ROW_XPATH):
+        tds = iter(row.xpath('.//td'))
+        for td in tds:
+            label_elems = td.xpath(FIELD_LABEL_XPATH)
+            if not label_elems:
+                continue
 
-    return qa_requirements
+            label_text = _text(label_elems[0])
+            if 'label' in _classes(td):  # Text field label
+                content_td = next(tds, None)
+                if content_td is not None and 'cell' in _classes(content_td):
+                    qa_requirements[label_text] = _text(content_td)
+            else:  # Checkbox field
+                qa_requirements[label_text] = bool(td.xpath(".//img[@alt='Yes']"))
 
+    return qa_requirements
 
-def parse_supplier_material_no(html_content):
-    # Parse HTML with BeautifulSoup
-    soup = BeautifulSoup(html_content, 'html.parser')
 
+def _supplier_material_no_from_tree(tree):
     # Find the Supplier Material No. field
-    label_elem = soup.find('label', text="Supplier's Material No")
-    if not label_elem:
+    label_elems = tree.getroottree().xpath("//label[. = $text]", text="Supplier's Material No")
+    if not label_elems:
         print("Label Supplier's Material No not found in HTML.")
         return None
 
-    # The value is typically in the next sibling td with class 'cell'
-    cell_td = label_elem.find_next('td', class_='cell')
-    if cell_td:
-        return cell_td.get_text(strip=True).strip()
+    # The value is typically in the next td with class 'cell'
+    cell_tds = label_elems[0].xpath(CELL_TD_XPATH)
+    if cell_tds:
+        return _text(cell_tds[0])
 
     print("Value for 'Supplier Material No.' not found.")
     return None
 
 
+def parse_qa_requirements(html_content):
+    return _qa_requirements_from_tree(lxml.html.fromstring(html_content))
+
+
+def parse_supplier_material_no(html_content):
+    return _supplier_material_no_from_tree(lxml.html.fromstring(html_content))
+
+
+def parse_component_page(html_content):
+    """Parses a component page once and returns (qa_requirements, supplier_material_no)."""
+    html_hash = hash(html_content)
+    parsed = _page_cache.get(html_hash)
+    if parsed is None:
+        tree = lxml.html.fromstring(html_content)
+        parsed = _qa_requirements_from_tree(tree), _supplier_material_no_from_tree(tree)
+        _page_cache[html_hash] = parsed
+        if len(_page_cache) > PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    else:
+        _page_cache.move_to_end(html_hash)
+
+    # Hand out a copy so callers can't mutate the cached entry
+    qa_requirements, supplier_material_no = parsed
+    return dict(qa_requirements), supplier_material_no
+
+
 if __name__ == "__main__":
     html_path = r"/Users/ai/PycharmProjects/POC/hhd_study/temp_for_parser.html"
     with open(html_path, "r", encoding="utf-8") as f:
         html_content = f.read()
 
-    qa_requirements = parse_qa_requirements(html_content)
+    qa_requirements, supplier_material_no = parse_component_page(html_content)
     print("QA Requirements:")
     for key, value in qa_requirements.items():
         print(f"{key}: {value}")
-    supplier_material_no = parse_supplier_material_no(html_content)
     print(f"\nSupplier Material No.: {supplier_material_no}")
-
@@ -9,3 +9,5 @@ class Material(TypedDict):
     supplier_material_no: Optional[str]
     image_url: Optional[List[str]]
     qa_requirements: Optional[dict]
+    qa_bits: Optional[int]
+    qa_schema_version: Optional[int]
@@ -0,0 +1,48 @@
+"""
+Bit-packed encoding of the known QA checkbox fields.
+
+Each known field owns one bit, so the checked tests of a material fit in a
+single integer that is stored next to the raw qa_requirements dict.
+"""
+
+from typing import Any, Dict, Iterator, Optional
+
+QA_SCHEMA_VERSION = 1
+
+# Known checkbox fields, in the order they appear on the Quickbase form
+QA_FIELD_NAMES = (
+    "AG 5055.03 Instruction A on accessible coatings/substrates",
+    "AG 5055.03 Instruction B on applicable components",
+    "AG 5055.03 Instruction C for stickers",
+    "AG-8000-EU",
+    "AG-8001-EU",
+    "EU Nickel Release Directive 94/27/EC according to the PD CR 12471",
+    "16 CFR 1500.44 flammability of solid",
+    "No Testing Required",
+)
+QA_FIELD_INDEX = {name: idx for idx, name in enumerate(QA_FIELD_NAMES)}
+
+
+def normalize_field_name(name: str) -> str:
+    """Collapse the line breaks and indentation Quickbase leaves inside field labels."""
+    return " ".join(name.split())
+
+
+def encode_qa_bits(qa_reqs: Dict[str, Any]) -> Optional[int]:
+    """Pack the checked QA fields into an int, or None if a checked field is not in the schema."""
+    bits = 0
+    for name, value in qa_reqs.items():
+        if value is True:
+            idx = QA_FIELD_INDEX.get(normalize_field_name(name))
+            if idx is None:
+                return None
+            bits |= 1 << idx
+    return bits
+
+
+def iter_set_bits(mask: int) -> Iterator[int]:
+    """Yield the index of every set bit, lowest first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
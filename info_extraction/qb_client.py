@@ -1,86 +1,405 @@
+import asyncio
+import logging
+import random
 import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-from quickbase_client import QuickbaseApiClient
+import httpx
+import lxml.html
+import orjson
+from lxml import etree
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from info_extraction.config import Config, load_config
 from info_extraction.model import Material
 
+logger = logging.getLogger(__name__)
 
-class QBClient:
-    """A client for interacting with the Quickbase API."""
-    SRC_RE = re.compile(r'src\s*=\s*["\']([^"\']+)["\']', flags=re.IGNORECASE)
+# Transient Quickbase failures worth retrying: rate limiting and gateway/server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_ATTEMPTS = 5
+BACKOFF_INITIAL = 0.2  # seconds; doubled per attempt
+BACKOFF_MAX = 5.0
+RETRY_AFTER_MAX = 60.0  # longest server-requested wait we'll honour
+
+
+def _escape_qb(value: str) -> str:
+    """Escapes a value for use inside a single-quoted Quickbase query literal."""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+class BaseQBClient:
+    """Query building and response parsing shared by the sync and async clients."""
+    IMG_SRC_XPATH = etree.XPath("//img/@src")
+    # Fallback for markup lxml cannot parse; anchoring on the tag replaces a separate "<img" pre-check
+    IMG_SRC_RE = re.compile(r'<img\b[^>]*?\ssrc\s*=\s*["\']([^"\']+)["\']', flags=re.IGNORECASE | re.ASCII)
 
     def __init__(self, cfg: Config):
         self.cfg = cfg
+        # The query only varies by material number, so the rest is built once
+        self._where_prefix = f"{{{cfg.related_material_field}.CT.'"
+        # Per-client memo of successful lookups, keyed by material number
+        self._component_cache: dict[str, dict] = {}
+        self._attachment_cache: dict[str, list[dict]] = {}
+        # Field ids to select per table id; None means select every field
+        self._select_ids: dict[str, Optional[list[int]]] = {}
+
+    def clear_cache(self) -> None:
+        """Forgets every cached component and attachment lookup."""
+        self._component_cache.clear()
+        self._attachment_cache.clear()
+
+    def _where_str(self, material_number: str) -> str:
+        """Builds the Quickbase query matching records related to a material number."""
+        return f"{self._where_prefix}{_escape_qb(material_number)}'}}"
+
+    def _wanted_labels(self, table_id: str) -> tuple[str, ...]:
+        """The field labels get_material_details actually reads from a table."""
+        if table_id == self.cfg.material_table_id:
+            return self.cfg.component_id_field, self.cfg.material_cost_field, self.cfg.supplier_name_field
+        return (self.cfg.image_field,)
+
+    def _configured_select_ids(self, table_id: str) -> Optional[list[int]]:
+        """Field ids given in the config for a table, if any."""
+        if table_id == self.cfg.material_table_id:
+            return list(self.cfg.material_field_ids) or None
+        return list(self.cfg.attachment_field_ids) or None
+
+    @staticmethod
+    def _select_ids_from_fields(fields: list[dict], labels: tuple[str, ...]) -> Optional[list[int]]:
+        """Picks the ids of the wanted labels, or None (select everything) if one is missing."""
+        label_to_id = {field["label"]: field["id"] for field in fields}
+        if not all(label in label_to_id for label in labels):
+            return None
+        return [label_to_id[label] for label in labels]
+
+    def _decode_select_ids(self, content: bytes, table_id: str) -> Optional[list[int]]:
+        """Picks the wanted field ids from a fields response; None if the payload is malformed."""
+        try:
+            return self._select_ids_from_fields(orjson.loads(content), self._wanted_labels(table_id))
+        except (ValueError, TypeError, KeyError) as e:  # orjson.JSONDecodeError is a ValueError
+            logger.warning("Could not resolve field ids for table %s: malformed response: %s", table_id, e)
+            return None
+
+    @staticmethod
+    def _decode_records(content: bytes, table_id: str, material_number: str) -> Optional[dict]:
+        """Decodes a records response; None (like any failed query) if it isn't a JSON object."""
+        try:
+            response_data = orjson.loads(content)  # several times faster than response.json()
+        except orjson.JSONDecodeError as e:
+            logger.warning("Error querying table %s for material %s: invalid JSON: %s", table_id, material_number, e)
+            return None
+        if not isinstance(response_data, dict):
+            logger.warning("Error querying table %s for material %s: unexpected response: %.200s",
+                           table_id, material_number, response_data)
+            return None
+        return response_data
+
+    @staticmethod
+    def _field_labels(response_data) -> dict[str, str]:
+        """Maps each field id, as the string key records use, to its label (once per response)."""
+        return {str(field["id"]): field["label"] for field in response_data["fields"]}
+
+    @staticmethod
+    def _label_record(record: dict, labels: dict[str, str]) -> dict:
+        """Re-keys a record from field ids to field labels."""
+        # labels already holds the ids as strings, so each field is a single dict lookup
+        return {label: cell["value"] for field_id, label in labels.items() if (cell := record.get(field_id)) is not None}
+
+    def _parse_component_data(self, response_data, material_number: str) -> dict:
+        """Maps the first component record to {field label: value}."""
+        if not response_data or not response_data.get("data"):
+            logger.warning("No component data found for material number: %s", material_number)
+            return {}
+
+        labels = self._field_labels(response_data)
+        return self._label_record(response_data["data"][0], labels)
+
+    def _parse_attachments(self, response_data, material_number: str) -> list[dict]:
+        """Maps every attachment record to {field label: value}."""
+        if not response_data or not response_data.get("data"):
+            logger.warning("No attachments found for material number: %s", material_number)
+            return []
+
+        labels = self._field_labels(response_data)
+        return [self._label_record(record, labels) for record in response_data["data"]]
+
+    def _image_srcs(self, image_html: str) -> list[str]:
+        """The src of every <img> in an attachment's HTML, in document order."""
+        try:
+            tree = lxml.html.fromstring(image_html)
+        except (etree.ParserError, ValueError):
+            return self.IMG_SRC_RE.findall(image_html)
+        return [str(src) for src in self.IMG_SRC_XPATH(tree) if src]
+
+    def _build_material(self, material_number: str, component_data: dict, attachments: list[dict]) -> Material:
+        """Constructs a Material object from component and attachment data."""
+        image_field = self.cfg.image_field
+        image_urls = []
+        for att in attachments:
+            image_html = att.get(image_field)
+            if image_html:
+                image_urls.extend(self._image_srcs(image_html))
+
+        return Material(
+            material_number=material_number,
+            component_id=component_data.get(self.cfg.component_id_field),
+            cost=component_data.get(self.cfg.material_cost_field),
+            supplier_name=component_data.get(self.cfg.supplier_name_field),
+            image_url=image_urls,
+            qa_requirements=None,
+        )
+
+
+class QBClient(BaseQBClient):
+    """
+    A client for interacting with the Quickbase API.
+
+    Each instance keeps a pool of warm HTTPS connections, so create one and reuse it
+    for every lookup rather than building a new client per material.
+    """
+
+    def __init__(self, cfg: Config):
+        super().__init__(cfg)
+        # Only the sync client needs quickbase_client, so the async path never imports it
+        from quickbase_client import QuickbaseApiClient
+
         self.client = QuickbaseApiClient(
             realm_hostname=cfg.realm,
             user_token=cfg.token,
         )
+        self._configure_session(self.client._rf.session)
+        # Runs the component lookup alongside the attachment lookup
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def _configure_session(session) -> None:
+        """Widens the connection pool of the requests session and retries transient failures."""
+        retry = Retry(
+            total=MAX_ATTEMPTS - 1,
+            backoff_factor=BACKOFF_INITIAL,
+            backoff_max=BACKOFF_MAX,
+            backoff_jitter=BACKOFF_INITIAL,  # spreads out retries from concurrent lookups
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "POST"}),  # record queries are read-only POSTs
+        )
+        session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry))
+        session.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+
+    def _get_select_ids(self, table_id: str) -> Optional[list[int]]:
+        """Field ids to request from a table, resolved from their labels once per client."""
+        if table_id not in self._select_ids:
+            select_ids = self._configured_select_ids(table_id)
+            if select_ids is None:
+                try:
+                    response = self.client.get_fields_for_table(table_id)
+                except requests.RequestException as e:
+                    logger.warning("Could not resolve field ids for table %s: %s", table_id, e)
+                else:
+                    if response.ok:
+                        select_ids = self._decode_select_ids(response.content, table_id)
+                    else:
+                        logger.warning("Could not resolve field ids for table %s: HTTP %s: %s",
+                                       table_id, response.status_code, response.text[:200])
+            self._select_ids[table_id] = select_ids
+        return self._select_ids[table_id]
 
     def _query_table(self, table_id: str, material_number: str):
         """Helper to query a table by material number."""
-        where_str = f"{{{self.cfg.related_material_field}.CT.'{material_number}'}}"
+        where_str = self._where_str(material_number)
+        select_ids = self._get_select_ids(table_id)
         try:
-            response = self.client.query(table_id=table_id, where_str=where_str)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"Error querying table {table_id} for material {material_number}: {e}")
+            response = self.client.query(table_id=table_id, fields_to_select=select_ids, where_str=where_str)
+        except requests.RequestException as e:
+            logger.error("Error querying table %s for material %s", table_id, material_number, exc_info=e)
             return None
+        if not response.ok:
+            logger.warning("Error querying table %s for material %s: HTTP %s: %s",
+                           table_id, material_number, response.status_code, response.text[:200])
+            return None
+        return self._decode_records(response.content, table_id, material_number)
 
     def get_component_data(self, material_number: str) -> dict:
         """Fetches component data for a given material number."""
-        response_data = self._query_table(self.cfg.material_table_id, material_number)
-        if not response_data or not response_data.get("data"):
-            print(f"No component data found for material number: {material_number}")
-            return {}
+        if material_number in self._component_cache:
+            return self._component_cache[material_number]
 
-        record = response_data["data"][0]
-        component_data = {}
-        for field in response_data["fields"]:
-            field_id = str(field["id"])
-            if field_id in record:
-                component_data[field["label"]] = record[field_id]["value"]
+        response_data = self._query_table(self.cfg.material_table_id, material_number)
+        component_data = self._parse_component_data(response_data, material_number)
+        if response_data is not None:  # don't cache failed requests
+            self._component_cache[material_number] = component_data
         return component_data
 
     def get_attachments(self, material_number: str) -> list[dict]:
         """Fetches attachment data for a given material number."""
-        response_data = self._query_table(self.cfg.attachment_table_id, material_number)
-        if not response_data or not response_data.get("data"):
-            print(f"No attachments found for material number: {material_number}")
-            return []
+        if material_number in self._attachment_cache:
+            return self._attachment_cache[material_number]
 
-        attachments = []
-        for record in response_data["data"]:
-            attachment_info = {}
-            for field in response_data["fields"]:
-                field_id = str(field["id"])
-                if field_id in record:
-                    attachment_info[field["label"]] = record[field_id]["value"]
-            attachments.append(attachment_info)
+        response_data = self._query_table(self.cfg.attachment_table_id, material_number)
+        attachments = self._parse_attachments(response_data, material_number)
+        if response_data is not None:  # don't cache failed requests
+            self._attachment_cache[material_number] = attachments
         return attachments
 
+    def get_material_bundle(self, material_number: str) -> tuple[dict, list[dict]]:
+        """Fetches component data and attachments concurrently, costing one round-trip of latency."""
+        component_future = self._executor.submit(self.get_component_data, material_number)
+        attachments = self.get_attachments(material_number)
+        return component_future.result(), attachments
+
     def get_material_details(self, material_number: str) -> Material:
         """Constructs a Material object from component and attachment data."""
-        component_data = self.get_component_data(material_number)
-        attachments = self.get_attachments(material_number)
+        component_data, attachments = self.get_material_bundle(material_number)
+        return self._build_material(material_number, component_data, attachments)
 
-        image_urls = []
-        for att in attachments:
-            image_html = att.get(self.cfg.image_field)
-            if image_html and "<img" in image_html.lower():
-                match = self.SRC_RE.search(image_html)
-                if match:
-                    image_urls.append(match.group(1))
 
-        return Material(
-            material_number=material_number,
-            component_id=component_data.get(self.cfg.component_id_field),
-            cost=component_data.get(self.cfg.material_cost_field),
-            supplier_name=component_data.get(self.cfg.supplier_name_field),
-            image_url=image_urls,
-            qa_requirements=None,
+class AsyncQBClient(BaseQBClient):
+    """
+    An asyncio client for the Quickbase API, for looking up many materials at once.
+
+    Use it as `async with AsyncQBClient(cfg) as client:` so the connection pool is closed.
+    """
+    QUERY_URL = "https://api.quickbase.com/v1/records/query"
+    FIELDS_URL = "https://api.quickbase.com/v1/fields"
+
+    def __init__(self, cfg: Config, max_concurrency: int = 8, requests_per_second: float = 10.0):
+        super().__init__(cfg)
+        self.client = httpx.AsyncClient(
+            http2=True,
+            headers={
+                "QB-Realm-Hostname": cfg.realm,
+                "Authorization": f"QB-USER-TOKEN {cfg.token}",
+                "User-Agent": "python",
+            },
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+            # CT queries over large tables can take tens of seconds; httpx's 5 s default is too short
+            timeout=httpx.Timeout(60.0, connect=10.0),
         )
+        # Caps in-flight requests, and spaces out request starts to stay under
+        # Quickbase's rate limit of 100 requests per 10 seconds per user token
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._min_interval = 1.0 / requests_per_second
+        self._next_request_at = 0.0
+        self._rate_lock = asyncio.Lock()
+        self._select_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes the underlying connection pool."""
+        await self.client.aclose()
+
+    async def _throttle(self) -> None:
+        """Waits until the rate limit allows another request to start."""
+        async with self._rate_lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_request_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_request_at = loop.time() + self._min_interval
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[httpx.Response]) -> float:
+        """Exponential backoff with jitter, stretched to any Retry-After the server sent."""
+        delay = min(BACKOFF_MAX, BACKOFF_INITIAL * 2 ** attempt) + random.uniform(0, BACKOFF_INITIAL)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(RETRY_AFTER_MAX, float(retry_after)))
+        return delay
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends a request, retrying connection errors and transient statuses with backoff."""
+        for attempt in range(MAX_ATTEMPTS):
+            response = None
+            try:
+                async with self._semaphore:
+                    await self._throttle()
+                    response = await self.client.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_ATTEMPTS - 1:
+                    return response
+            except httpx.TransportError:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def _get_select_ids(self, table_id: str) -> Optional[list[int]]:
+        """Field ids to request from a table, resolved from their labels once per client."""
+        if table_id in self._select_ids:  # resolved already; only resolution needs the lock
+            return self._select_ids[table_id]
+        async with self._select_lock:
+            if table_id not in self._select_ids:
+                select_ids = self._configured_select_ids(table_id)
+                if select_ids is None:
+                    try:
+                        response = await self._send("GET", self.FIELDS_URL, params={"tableId": table_id})
+                    except httpx.HTTPError as e:
+                        logger.warning("Could not resolve field ids for table %s: %s", table_id, e)
+                    else:
+                        if response.is_success:
+                            select_ids = self._decode_select_ids(response.content, table_id)
+                        else:
+                            logger.warning("Could not resolve field ids for table %s: HTTP %s: %s",
+                                           table_id, response.status_code, response.text[:200])
+                self._select_ids[table_id] = select_ids
+        return self._select_ids[table_id]
+
+    async def _query_table(self, table_id: str, material_number: str):
+        """Helper to query a table by material number."""
+        payload = {"from": table_id, "where": self._where_str(material_number)}
+        select_ids = await self._get_select_ids(table_id)
+        if select_ids is not None:
+            payload["select"] = select_ids
+        try:
+            response = await self._send("POST", self.QUERY_URL, json=payload)
+        except httpx.HTTPError as e:
+            logger.error("Error querying table %s for material %s", table_id, material_number, exc_info=e)
+            return None
+        if not response.is_success:
+            logger.warning("Error querying table %s for material %s: HTTP %s: %s",
+                           table_id, material_number, response.status_code, response.text[:200])
+            return None
+        return self._decode_records(response.content, table_id, material_number)
+
+    async def get_component_data(self, material_number: str) -> dict:
+        """Fetches component data for a given material number."""
+        if material_number in self._component_cache:
+            return self._component_cache[material_number]
+
+        response_data = await self._query_table(self.cfg.material_table_id, material_number)
+        component_data = self._parse_component_data(response_data, material_number)
+        if response_data is not None:  # don't cache failed requests
+            self._component_cache[material_number] = component_data
+        return component_data
+
+    async def get_attachments(self, material_number: str) -> list[dict]:
+        """Fetches attachment data for a given material number."""
+        if material_number in self._attachment_cache:
+            return self._attachment_cache[material_number]
+
+        response_data = await self._query_table(self.cfg.attachment_table_id, material_number)
+        attachments = self._parse_attachments(response_data, material_number)
+        if response_data is not None:  # don't cache failed requests
+            self._attachment_cache[material_number] = attachments
+        return attachments
+
+    async def get_material_details(self, material_number: str) -> Material:
+        """Constructs a Material object from component and attachment data."""
+        component_data, attachments = await asyncio.gather(
+            self.get_component_data(material_number),
+            self.get_attachments(material_number),
+        )
+        return self._build_material(material_number, component_data, attachments)
+
+    async def get_material_details_many(self, material_numbers: list[str]) -> list[Material]:
+        """Looks up several materials concurrently; results keep the input order."""
+        return list(await asyncio.gather(*(self.get_material_details(mn) for mn in material_numbers)))
 
 
 if __name__ == "__main__":
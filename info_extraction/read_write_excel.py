@@ -1,26 +1,38 @@
+import logging
 import os
-import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def _read_sheet(xl, sheet_name: str, column_name: str) -> list[str]:
+    """Reads the non-empty values of one column from one sheet of an open workbook, as strings."""
+    # Keep only the wanted column; a sheet without it comes back with no columns
+    # Read straight into StringDtype (arrow-backed when pyarrow is installed)
+    df = xl.parse(sheet_name, usecols=lambda c: c == column_name, dtype={column_name: "string"})
+    if column_name not in df.columns:
+        # print(f"Column '{column_name}' not found in sheet '{sheet_name}'.")
+        return []
+    # Numeric cells already arrive as "6860340"; clean numbers typed as text ("6860340.0", " 6860340 ")
+    # with vectorized string ops rather than per-row Python
+    numbers = df[column_name].dropna().str.strip().str.removesuffix(".0")
+    return numbers[numbers != ""].tolist()
 
 def read_material_numbers_from_excel(path: str, column_name: str) -> list[str]:
     """Reads a specific column from all sheets of an Excel file."""
     if not os.path.exists(path):
-        print(f"File not found: {path}")
+        logger.warning("File not found: %s", path)
         return []
 
+    import pandas as pd  # deferred so callers that never open Excel don't pay for it
+
+    material_numbers: dict[str, None] = {}  # ordered set: first-seen order, no duplicates
     try:
-        engine = "xlrd" if path.lower().endswith(".xls") else "openpyxl"
-        data = pd.read_excel(path, engine=engine, sheet_name=None)
+        # calamine reads .xls, .xlsx and .xlsm natively and much faster than xlrd/openpyxl;
+        # the workbook is opened once and its sheets parsed in turn
+        with pd.ExcelFile(path, engine="calamine") as xl:
+            for sheet_name in xl.sheet_names:
+                material_numbers.update(dict.fromkeys(_read_sheet(xl, sheet_name, column_name)))
     except Exception as e:
-        print(f"Error reading Excel file {path}: {e}")
+        logger.error("Error reading Excel file %s", path, exc_info=e)
         return []
 
-    material_numbers = []
-    for sheet_name, df in data.items():
-        if column_name in df.columns:
-            # Convert to string, drop NA values, and extend the list
-            numbers = df[column_name].dropna().astype(str).tolist()
-            material_numbers.extend(numbers)
-        # else:
-        #     print(f"Column '{column_name}' not found in sheet '{sheet_name}'.")
-
-    return list(set(material_numbers)) # Return unique values
+    return list(material_numbers) # Return unique values in first-seen order
@@ -16,63 +16,94 @@ downloads/
 Each <source_excel_stem> directory will receive a <source_excel_stem>_summary.xlsx file.
 """
 
-import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.drawing.image import Image as XLImage
 from openpyxl.styles import Alignment
 
+from info_extraction.qa_bits import QA_FIELD_NAMES, QA_SCHEMA_VERSION, iter_set_bits, normalize_field_name
+
 # --------------------------------------------------------------------------- #
 # Configuration – update BASE_DOWNLOAD_DIR to match your environment
 # --------------------------------------------------------------------------- #
 BASE_DOWNLOAD_DIR = Path("/downloads")
 SUMMARY_SUFFIX = "_summary.xlsx"
+# Free-text QA fields appended after the checked tests
+QA_TEXT_FIELDS = ("Additional Tests", "Comments")
+QA_ALIGNMENT = Alignment(wrap_text=True, vertical="top")
+# Entry keys written to columns A-E, ahead of the QA and image columns
+SUMMARY_FIELDS = ("material_number", "component_id", "cost", "supplier_name", "supplier_material_no")
 
 
 # --------------------------------------------------------------------------- #
 # Helpers
 # --------------------------------------------------------------------------- #
-def format_qa_requirements(qa_reqs: Optional[Dict[str, Any]]) -> str:
-    """Return newline-delimited list of QA tests whose value is True."""
+def format_qa_requirements(qa_reqs: Optional[Dict[str, Any]], qa_bits: Optional[int] = None) -> str:
+    """Return newline-delimited list of QA tests whose value is True.
+
+    Records saved with packed qa_bits are decoded from the bitmask; older ones
+    fall back to scanning the dict. Both print the normalized field names.
+    """
     if not qa_reqs:
         return ""
-    true_tests = [
-        name for name, value in qa_reqs.items()
-        if isinstance(value, bool) and value
-    ]
-    if qa_reqs.get("Additional Tests", "") != "":
-        true_tests.append("Additional Tests" + qa_reqs.get("Additional Tests", ""))
-    if qa_reqs.get("Comments", "") != "":
-        true_tests.append("Comments" + qa_reqs.get("Comments", ""))
+    # Quickbase labels carry line breaks and indentation ("Additional\n    Tests")
+    normalized = {normalize_field_name(name): value for name, value in qa_reqs.items()}
+    if qa_bits is not None:
+        true_tests = [QA_FIELD_NAMES[idx] for idx in iter_set_bits(qa_bits)]
+    else:
+        true_tests = [name for name, value in normalized.items() if value is True]
+    for field in QA_TEXT_FIELDS:
+        if extra := normalized.get(field):
+            true_tests.append(f"{field}{extra}")
 
     return "\n".join(true_tests)
 
 
-def find_material_json(material_dir: Path) -> Optional[Path]:
-    """Locate the JSON snapshot inside a material directory."""
-    candidates = list(material_dir.glob("material_*_data.json"))
-    return candidates[0] if candidates else None
+def scan_material_dir(material_dir: Path) -> Tuple[Optional[Path], Optional[Path]]:
+    """Locate the JSON snapshot and the images folder in a single directory pass."""
+    json_path: Optional[Path] = None
+    image_dir: Optional[Path] = None
+    with os.scandir(material_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if json_path is None and name.startswith("material_") and name.endswith("_data.json"):
+                json_path = Path(entry.path)
+            elif name == "images" and entry.is_dir():
+                image_dir = Path(entry.path)
+    return json_path, image_dir
+
+
+def find_first_image(image_dir: Path) -> Optional[Path]:
+    """Return the image file that sorts first by name, without sorting the folder."""
+    first: Optional[os.DirEntry] = None
+    with os.scandir(image_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and (first is None or entry.name < first.name):
+                first = entry
+    return Path(first.path) if first else None
 
 
 def collect_material_entry(material_dir: Path) -> Optional[Dict[str, Any]]:
     """Parse the JSON + locate images for a single material."""
-    json_path = find_material_json(material_dir)
+    json_path, image_dir = scan_material_dir(material_dir)
     if not json_path:
         print(f"[WARN] JSON not found in {material_dir}")
         return None
 
     try:
-        with open(json_path, "r") as f:
-            data = json.load(f)
+        data = orjson.loads(json_path.read_bytes())
     except Exception as exc:
         print(f"[WARN] Failed to read {json_path}: {exc}")
         return None
 
-    image_dir = material_dir / "images"
-    image_paths = sorted(image_dir.glob("*")) if image_dir.exists() else []
-    first_image = next((img for img in image_paths if img.is_file()), None)
+    first_image = find_first_image(image_dir) if image_dir else None
+    qa_bits = data.get("qa_bits") if data.get("qa_schema_version") == QA_SCHEMA_VERSION else None
 
     return {
         "material_number": data.get("material_number"),
@@ -80,7 +111,7 @@ def collect_material_entry(material_dir: Path) -> Optional[Dict[str, Any]]:
         "cost": data.get("cost"),
         "supplier_name": data.get("supplier_name"),
         "supplier_material_no": data.get("supplier_material_no"),
-        "qa_text": format_qa_requirements(data.get("qa_requirements")),
+        "qa_text": format_qa_requirements(data.get("qa_requirements"), qa_bits),
         "image_path": first_image,
     }
 
@@ -91,9 +122,9 @@ def write_summary_excel(entries: List[Dict[str, Any]], output_path: Path) -> Non
         print(f"[INFO] No material entries for {output_path.parent.name}; skipping Excel export.")
         return
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Materials"
+    # Write-only mode streams each row to the file instead of keeping every cell in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Materials")
 
     headers = [
         "Material Number",
@@ -104,7 +135,6 @@ def write_summary_excel(entries: List[Dict[str, Any]], output_path: Path) -> Non
         "QA Requirements (True)",
         "Image",
     ]
-    ws.append(headers)
 
     column_widths = {
         "A": 18,
@@ -115,19 +145,13 @@ def write_summary_excel(entries: List[Dict[str, Any]], output_path: Path) -> Non
         "F": 60,
         "G": 20,
     }
+    # Column and row dimensions must be set before the affected rows are streamed
     for col_letter, width in column_widths.items():
         ws.column_dimensions[col_letter].width = width
 
-    for row_idx, entry in enumerate(entries, start=2):
-        ws.cell(row=row_idx, column=1, value=entry.get("material_number"))
-        ws.cell(row=row_idx, column=2, value=entry.get("component_id"))
-        ws.cell(row=row_idx, column=3, value=entry.get("cost"))
-        ws.cell(row=row_idx, column=4, value=entry.get("supplier_name"))
-        ws.cell(row=row_idx, column=5, value=entry.get("supplier_material_no"))
-
-        qa_cell = ws.cell(row=row_idx, column=6, value=entry.get("qa_text") or "")
-        qa_cell.alignment = Alignment(wrap_text=True, vertical="top")
+    ws.append(headers)
 
+    for row_idx, entry in enumerate(entries, start=2):
         image_path = entry.get("image_path")
         if image_path and image_path.exists():
             try:
@@ -135,13 +159,15 @@ def write_summary_excel(entries: List[Dict[str, Any]], output_path: Path) -> Non
                 img.width = 120
                 img.height = 120
                 ws.add_image(img, f"G{row_idx}")
-                ws.row_dimensions[row_idx].height = max(
-                    ws.row_dimensions[row_idx].height or 0,
-                    100,
-                )
+                ws.row_dimensions[row_idx].height = 100
             except Exception as exc:
                 print(f"[WARN] Failed to embed image {image_path}: {exc}")
 
+        qa_cell = WriteOnlyCell(ws, value=entry.get("qa_text") or "")
+        qa_cell.alignment = QA_ALIGNMENT
+
+        ws.append([entry.get(key) for key in SUMMARY_FIELDS] + [qa_cell])
+
     wb.save(output_path)
     print(f"[OK] Summary written to {output_path}")
 
@@ -149,6 +175,30 @@ def write_summary_excel(entries: List[Dict[str, Any]], output_path: Path) -> Non
 # --------------------------------------------------------------------------- #
 # Main workflow
 # --------------------------------------------------------------------------- #
+def build_source_summary(source_dir: Path, final_report_dir: Path) -> None:
+    """Collect every material under one source directory and write its summary workbook."""
+    print(f"\n[INFO] Processing source directory: {source_dir.name}")
+
+    # DirEntry.is_dir() answers from the readdir type, without a stat() per entry
+    with os.scandir(source_dir) as dir_entries:
+        material_dirs = sorted(
+            Path(e.path) for e in dir_entries
+            if e.name.startswith("material_") and e.is_dir()
+        )
+    if not material_dirs:
+        print(f"[INFO] No material folders found in {source_dir}")
+        return
+
+    # JSON reads are mostly file IO, so threads overlap them well
+    with ThreadPoolExecutor() as executor:
+        entries: List[Dict[str, Any]] = [
+            entry for entry in executor.map(collect_material_entry, material_dirs) if entry
+        ]
+
+    summary_path = final_report_dir / f"{source_dir.name}{SUMMARY_SUFFIX}"
+    write_summary_excel(entries, summary_path)
+
+
 def generate_reports(base_download_dir: Path) -> None:
     """Build a summary workbook for each source Excel folder under base_download_dir."""
     if not base_download_dir.exists():
@@ -156,26 +206,12 @@ def generate_reports(base_download_dir: Path) -> None:
     final_report_dir = base_download_dir / "summary"
     final_report_dir.mkdir(parents=True, exist_ok=True)
 
-    for source_dir in sorted(p for p in base_download_dir.iterdir() if p.is_dir()):
-        print(f"\n[INFO] Processing source directory: {source_dir.name}")
-
-        material_dirs = sorted(
-            p for p in source_dir.iterdir()
-            if p.is_dir() and p.name.startswith("material_")
-        )
-        if not material_dirs:
-            print(f"[INFO] No material folders found in {source_dir}")
-            continue
-
-        entries: List[Dict[str, Any]] = []
-        for material_dir in material_dirs:
-            entry = collect_material_entry(material_dir)
-            if entry:
-                entries.append(entry)
-
-        summary_path = final_report_dir / f"{source_dir.name}{SUMMARY_SUFFIX}"
-        write_summary_excel(entries, summary_path)
-
+    with os.scandir(base_download_dir) as dir_entries:
+        # The summary folder just created is output, not a source
+        source_dirs = sorted(Path(e.path) for e in dir_entries if e.is_dir() and e.name != final_report_dir.name)
+    # Each source takes milliseconds, less than starting a worker process would
+    for source_dir in source_dirs:
+        build_source_summary(source_dir, final_report_dir)
 
 if __name__ == "__main__":
     generate_reports(BASE_DOWNLOAD_DIR)
@@ -1,21 +1,32 @@
-import json
+import asyncio
+import logging
 import time
 from pathlib import Path
 
 import nodriver as uc
+import orjson
 from nodriver.core.util import deconstruct_browser
 
 from info_extraction.config import config
-from info_extraction.html_parser import parse_qa_requirements, parse_supplier_material_no
-from info_extraction.qb_client import QBClient
+from info_extraction.html_parser import parse_component_page
+from info_extraction.qa_bits import QA_SCHEMA_VERSION, encode_qa_bits
+from info_extraction.model import Material
+from info_extraction.qb_client import AsyncQBClient
 from info_extraction.read_write_excel import read_material_numbers_from_excel
 from info_extraction.web_scraper import WebScraper
 
 
-async def process_material(mano: str, scraper: WebScraper, client: QBClient, output_folder: Path):
-    """Processes a single material number."""
+async def process_material(material_data: Material, scraper: WebScraper, output_folder: Path,
+                           qa_cache: dict | None = None):
+    """Processes a single material whose Quickbase details were already fetched.
+
+    qa_cache maps component ids to their parsed (qa_requirements, supplier_material_no),
+    so materials sharing a component only fetch its page once.
+    """
+    if qa_cache is None:
+        qa_cache = {}
+    mano = material_data["material_number"]
     print(f"--- Processing Material: {mano} ---")
-    material_data = client.get_material_details(mano)
     comp_id = material_data.get("component_id")
 
     mano_folder = output_folder / f"material_{mano}"
@@ -25,11 +36,15 @@ async def process_material(mano: str, scraper: WebScraper, client: QBClient, out
         try:
             # Ensure component_id is an integer for the URL
             rid = int(comp_id)
-            html = await scraper.get_qa_html(rid)
-            qa_reqs = parse_qa_requirements(html)
+            if rid not in qa_cache:
+                html = await scraper.get_qa_html(rid)
+                qa_cache[rid] = parse_component_page(html)
+            qa_reqs, sup_mat_no = qa_cache[rid]
             material_data["qa_requirements"] = qa_reqs
-
-            sup_mat_no = parse_supplier_material_no(html)
+            qa_bits = encode_qa_bits(qa_reqs)
+            if qa_bits is not None:
+                material_data["qa_bits"] = qa_bits
+                material_data["qa_schema_version"] = QA_SCHEMA_VERSION
             material_data["supplier_material_no"] = sup_mat_no
 
         except (ValueError, TypeError) as e:
@@ -46,37 +61,46 @@ async def process_material(mano: str, scraper: WebScraper, client: QBClient, out
 
     # Save all collected data
     json_path = mano_folder / f"material_{mano}_data.json"
-    with open(json_path, "w") as f:
-        json.dump(material_data, f, indent=4)
+    json_path.write_bytes(orjson.dumps(material_data, option=orjson.OPT_INDENT_2))
     print(f"--- Finished Material: {mano} ---\n\n\n")
 
 
 async def run_extraction(file_list, output_folder=None):
     """Main orchestration function for multiple Excel files."""
     valid_xlsx = False
-    for excel_path in file_list:
-        print(f"Processing file: {excel_path}")
-        material_numbers = read_material_numbers_from_excel(excel_path, config.material_number_field)
-        if not material_numbers:
-            print("No material numbers found in the Excel file.")
-            continue
-        valid_xlsx = True
+    qa_cache: dict = {}
+    async with AsyncQBClient(config) as qb_client:  # one connection pool for the whole run
+        for excel_path in file_list:
+            if await process_excel(excel_path, qb_client, output_folder, qa_cache):
+                valid_xlsx = True
+
+    deconstruct_browser()
+    return valid_xlsx
 
-        print(f"Found {len(material_numbers)} material numbers to process.")
-        if output_folder is None:
-            output_folder = Path("downloads")
 
-        output_folder_folder = output_folder / Path(excel_path).stem
-        output_folder_folder.mkdir(parents=True, exist_ok=True)
+async def process_excel(excel_path, qb_client: AsyncQBClient, output_folder: Path | None, qa_cache: dict) -> bool:
+    """Processes every material listed in one Excel file; returns False if it has none."""
+    print(f"Processing file: {excel_path}")
+    # Parse off the event loop so the browser and Gradio stay responsive
+    material_numbers = await asyncio.to_thread(read_material_numbers_from_excel, excel_path, config.material_number_field)
+    if not material_numbers:
+        print("No material numbers found in the Excel file.")
+        return False
 
-        qb_client = QBClient(config)
+    print(f"Found {len(material_numbers)} material numbers to process.")
+    if output_folder is None:
+        output_folder = Path("downloads")
 
-        async with WebScraper(config, headless=config.headless) as scraper:
-            for mano in material_numbers:
-                await process_material(mano, scraper, qb_client, output_folder_folder)
+    output_folder_folder = output_folder / Path(excel_path).stem
+    output_folder_folder.mkdir(parents=True, exist_ok=True)
 
-    deconstruct_browser()
-    return valid_xlsx
+    # Quickbase lookups run concurrently; the browser then walks the materials in order
+    materials = await qb_client.get_material_details_many(material_numbers)
+
+    async with WebScraper(config, headless=config.headless) as scraper:
+        for material_data in materials:
+            await process_material(material_data, scraper, output_folder_folder, qa_cache)
+    return True
 
 async def extract_data(file_list, output_folder: Path = None):
     output_folder.mkdir(parents=True, exist_ok=True)
@@ -85,6 +109,7 @@ async def extract_data(file_list, output_folder: Path = None):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     parent_dir = Path("/root/PycharmProjects/hhdream_study/ES.C95914")
     file_list = [str(file) for file in parent_dir.glob("*.xls")]
 